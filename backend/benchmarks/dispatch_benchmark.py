@@ -0,0 +1,101 @@
+"""
+自動配車エンジンのベンチマーク（greedy と matching の品質・実行時間の比較）
+
+使い方（backend ディレクトリで）:
+    python -m benchmarks.dispatch_benchmark
+    python -m benchmarks.dispatch_benchmark --sizes 1000 5000 --drivers 100
+"""
+from __future__ import annotations
+import argparse
+import math
+import random
+import statistics
+import time
+from datetime import date
+from models import Order, Driver
+from services.dispatch_engine import run_dispatch, total_distance, time_to_minutes
+
+# 東京駅周辺 約20km四方
+CENTER_LAT, CENTER_LNG = 35.6812, 139.7671
+SPREAD_DEG = 0.1
+
+DAY_START = 8 * 60
+DAY_END = 21 * 60
+SLOT_MINUTES = 30
+
+
+def minutes_to_time(m: int) -> str:
+    return f"{m // 60:02d}:{m % 60:02d}"
+
+
+def make_orders(n: int, rng: random.Random) -> list[Order]:
+    """30分刻みの開始時刻・30〜60分枠のオーダーを生成（DBには保存しない）"""
+    starts = list(range(DAY_START, DAY_END, SLOT_MINUTES))
+    orders = []
+    for i in range(n):
+        start = rng.choice(starts)
+        end = start + rng.choice([SLOT_MINUTES, SLOT_MINUTES * 2])
+        orders.append(Order(
+            id=i + 1,
+            delivery_date=date.today(),
+            address=f"bench-{i + 1}",
+            time_start=minutes_to_time(start),
+            time_end=minutes_to_time(end),
+            lat=CENTER_LAT + rng.uniform(-SPREAD_DEG, SPREAD_DEG),
+            lng=CENTER_LNG + rng.uniform(-SPREAD_DEG, SPREAD_DEG),
+        ))
+    return orders
+
+
+def default_driver_count(n: int) -> int:
+    # 1人あたり1日に捌ける枠数から、ほぼ全件割り当てられる人数を見積もる
+    slots = (DAY_END - DAY_START) // SLOT_MINUTES
+    return max(1, math.ceil(n / slots * 1.5))
+
+
+def evaluate(result: dict) -> dict:
+    jobs = [len(v) for v in result["assigned"].values()]
+    distances = [
+        total_distance(sorted(v, key=lambda o: time_to_minutes(o.time_start)))
+        for v in result["assigned"].values()
+    ]
+    return {
+        "assigned": sum(jobs),
+        "unassigned": len(result["unassigned"]),
+        "jobs_range": max(jobs) - min(jobs),
+        "jobs_std": statistics.pstdev(jobs),
+        "km_total": sum(distances),
+        "km_range": max(distances) - min(distances),
+        "km_std": statistics.pstdev(distances),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 2000, 5000, 10000])
+    parser.add_argument("--drivers", type=int, default=None, help="配達員数（省略時はオーダー数から自動）")
+    parser.add_argument("--modes", nargs="+", default=["greedy", "matching"])
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    header = f"{'orders':>7} {'drivers':>7} {'mode':>9} {'sec':>8} {'assigned':>8} {'unasg':>6} " \
+             f"{'jobs_rng':>8} {'jobs_sd':>7} {'km_total':>9} {'km_rng':>8} {'km_sd':>7}"
+    print(header)
+    print("-" * len(header))
+    for n in args.sizes:
+        rng = random.Random(args.seed)
+        orders = make_orders(n, rng)
+        m = args.drivers or default_driver_count(n)
+        drivers = [Driver(id=i + 1, name=f"driver-{i + 1}") for i in range(m)]
+        for mode in args.modes:
+            t0 = time.perf_counter()
+            result = run_dispatch(orders, drivers, mode=mode)
+            elapsed = time.perf_counter() - t0
+            s = evaluate(result)
+            print(f"{n:>7} {m:>7} {mode:>9} {elapsed:>8.2f} {s['assigned']:>8} {s['unassigned']:>6} "
+                  f"{s['jobs_range']:>8} {s['jobs_std']:>7.2f} {s['km_total']:>9.1f} "
+                  f"{s['km_range']:>8.1f} {s['km_std']:>7.2f}")
+
+
+if __name__ == "__main__":
+    main()
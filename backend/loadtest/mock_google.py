@@ -0,0 +1,113 @@
+"""
+Google Maps API（Geocoding / Distance Matrix）のローカル代替サーバー
+
+住所から決定的な座標（東京駅周辺）を返す。遅延とエラー率は引数で調整する。
+
+    python -m loadtest.mock_google --port 8900 --latency-ms 80 --jitter-ms 40 --error-rate 0.02
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import hashlib
+import random
+from fastapi import FastAPI, Query
+from fastapi.responses import JSONResponse
+from services.distance_service import haversine_km
+
+CENTER_LAT, CENTER_LNG = 35.6812, 139.7671
+SPREAD_DEG = 0.1
+AVERAGE_SPEED_KMH = 25.0
+
+
+class MockSettings:
+    latency_ms: float = 0.0
+    jitter_ms: float = 0.0
+    error_rate: float = 0.0
+
+
+settings = MockSettings()
+app = FastAPI(title="Google Maps API mock")
+
+
+def address_to_latlng(address: str) -> tuple[float, float]:
+    """同じ住所には常に同じ座標を返す"""
+    digest = hashlib.sha1(address.encode()).digest()
+    u = int.from_bytes(digest[:4], "big") / 0xFFFFFFFF
+    v = int.from_bytes(digest[4:8], "big") / 0xFFFFFFFF
+    return CENTER_LAT + (u * 2 - 1) * SPREAD_DEG, CENTER_LNG + (v * 2 - 1) * SPREAD_DEG
+
+
+def parse_location(value: str) -> tuple[float, float]:
+    """'lat,lng' 形式ならそのまま、それ以外は住所として扱う"""
+    try:
+        lat, lng = (float(v) for v in value.split(","))
+        return lat, lng
+    except ValueError:
+        return address_to_latlng(value)
+
+
+async def simulate() -> JSONResponse | None:
+    """遅延を入れ、エラー率に応じてエラー応答を返す"""
+    delay = settings.latency_ms + random.uniform(-settings.jitter_ms, settings.jitter_ms)
+    if delay > 0:
+        await asyncio.sleep(delay / 1000)
+    if random.random() < settings.error_rate:
+        return JSONResponse(status_code=500, content={"status": "UNKNOWN_ERROR", "results": []})
+    return None
+
+
+@app.get("/maps/api/geocode/json")
+async def geocode(address: str = Query(...), key: str = Query("")):
+    error = await simulate()
+    if error:
+        return error
+    lat, lng = address_to_latlng(address)
+    return {
+        "status": "OK",
+        "results": [{
+            "formatted_address": address,
+            "geometry": {"location": {"lat": lat, "lng": lng}},
+        }],
+    }
+
+
+@app.get("/maps/api/distancematrix/json")
+async def distance_matrix(origins: str = Query(...), destinations: str = Query(...), key: str = Query("")):
+    error = await simulate()
+    if error:
+        return error
+    origin_points = [parse_location(o) for o in origins.split("|")]
+    destination_points = [parse_location(d) for d in destinations.split("|")]
+    rows = []
+    for o in origin_points:
+        elements = []
+        for d in destination_points:
+            km = haversine_km(o[0], o[1], d[0], d[1])
+            elements.append({
+                "status": "OK",
+                "distance": {"value": round(km * 1000)},
+                "duration": {"value": round(km / AVERAGE_SPEED_KMH * 3600)},
+            })
+        rows.append({"elements": elements})
+    return {"status": "OK", "rows": rows}
+
+
+def main() -> None:
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    settings.latency_ms = args.latency_ms
+    settings.jitter_ms = args.jitter_ms
+    settings.error_rate = args.error_rate
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
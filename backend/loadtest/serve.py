@@ -0,0 +1,104 @@
+"""
+負荷試験用に本体の FastAPI アプリを起動する
+
+本体には手を入れず、DB コネクションプールの使用状況を返す
+/_loadtest/pool を追加して uvicorn で起動する。
+DATABASE_URL などの環境変数は起動側（loadtest.run）が設定する。
+
+    python -m loadtest.serve --port 8901
+"""
+from __future__ import annotations
+import argparse
+import threading
+from sqlalchemy.pool import QueuePool
+
+POOL_SAMPLE_INTERVAL_SEC = 0.01
+
+
+class PoolSampler:
+    """コネクションプールの貸出数を一定間隔で記録する"""
+
+    def __init__(self, pool):
+        self.pool = pool
+        self.capacity = self._capacity(pool)
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self.reset()
+
+    @staticmethod
+    def _capacity(pool) -> int | None:
+        # QueuePool 以外（SingletonThreadPool・NullPool など）は上限・貸出数を持たない
+        if not isinstance(pool, QueuePool):
+            return None
+        return pool.size() + max(pool._max_overflow, 0)
+
+    def reset(self) -> None:
+        with self._lock:
+            self.samples = 0
+            self.saturated = 0
+            self.max_checked_out = 0
+            self.sum_checked_out = 0
+
+    def sample(self) -> None:
+        checked_out = self.pool.checkedout() if isinstance(self.pool, QueuePool) else 0
+        with self._lock:
+            self.samples += 1
+            self.sum_checked_out += checked_out
+            self.max_checked_out = max(self.max_checked_out, checked_out)
+            if self.capacity is not None and checked_out >= self.capacity:
+                self.saturated += 1
+
+    def run(self) -> None:
+        while not self._stop.wait(POOL_SAMPLE_INTERVAL_SEC):
+            self.sample()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "pool_class": type(self.pool).__name__,
+                "capacity": self.capacity,
+                "samples": self.samples,
+                "max_checked_out": self.max_checked_out,
+                "avg_checked_out": self.sum_checked_out / self.samples if self.samples else 0.0,
+                "saturated_ratio": self.saturated / self.samples if self.samples else 0.0,
+            }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8901)
+    parser.add_argument("--drop-tables", action="store_true", help="終了時に全テーブルを削除する")
+    parser.add_argument("--log-level", default="warning")
+    args = parser.parse_args()
+
+    import uvicorn
+    from database import Base, engine
+    from main import app
+
+    sampler = PoolSampler(engine.pool)
+    threading.Thread(target=sampler.run, daemon=True).start()
+
+    @app.get("/_loadtest/pool")
+    def pool_stats():
+        return sampler.snapshot()
+
+    @app.post("/_loadtest/pool/reset")
+    def pool_reset():
+        sampler.reset()
+        return sampler.snapshot()
+
+    try:
+        uvicorn.run(app, host=args.host, port=args.port, log_level=args.log_level)
+    finally:
+        sampler.stop()
+        if args.drop_tables:
+            Base.metadata.drop_all(bind=engine)
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
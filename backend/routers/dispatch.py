@@ -1,11 +1,16 @@
 from __future__ import annotations
+import math
 from datetime import date
-from fastapi import APIRouter, Depends, Query, Response, HTTPException
+from typing import Literal, Optional
+from fastapi import APIRouter, Depends, Header, Query, Response, HTTPException
 from sqlalchemy.orm import Session
 from database import get_db
 from models import Order, Driver, Assignment
-from schemas import DispatchResult, DispatchResultItem, OrderResponse, ManualAssignRequest
+from schemas import DispatchResult, DispatchResultItem, OrderResponse, ManualAssignRequest, DispatchMap
 from services.dispatch_engine import run_dispatch, total_distance
+from services.map_service import (
+    MAX_ZOOM, MIN_ZOOM, assignment_version, build_map_layer, get_cached_layer, store_layer,
+)
 from services.pdf_service import generate_dispatch_pdf
 
 router = APIRouter(prefix="/dispatch", tags=["dispatch"])
@@ -28,7 +33,11 @@ def order_to_response(order: Order, driver_id: int = None, driver_name: str = No
 
 
 @router.post("/run", response_model=DispatchResult)
-def run_auto_dispatch(delivery_date: date = Query(...), db: Session = Depends(get_db)):
+def run_auto_dispatch(
+    delivery_date: date = Query(...),
+    mode: Literal["greedy", "matching"] = Query("greedy"),
+    db: Session = Depends(get_db),
+):
     """自動配車を実行し、結果をDBに保存して返す"""
     try:
         orders = db.query(Order).filter(Order.delivery_date == delivery_date).all()
@@ -38,7 +47,7 @@ def run_auto_dispatch(delivery_date: date = Query(...), db: Session = Depends(ge
         db.query(Assignment).filter(Assignment.delivery_date == delivery_date).delete()
         db.commit()
 
-        result = run_dispatch(orders, drivers)
+        result = run_dispatch(orders, drivers, mode=mode)
 
         # 結果をDBに保存
         for driver_id, assigned_orders in result["assigned"].items():
@@ -144,3 +153,82 @@ def download_pdf(delivery_date: date = Query(...), db: Session = Depends(get_db)
         media_type="application/pdf",
         headers={"Content-Disposition": f"attachment; filename=dispatch_{delivery_date}.pdf"},
     )
+
+
+def parse_bbox(bbox: str) -> tuple[float, float, float, float]:
+    """'min_lng,min_lat,max_lng,max_lat' → タプル"""
+    try:
+        min_lng, min_lat, max_lng, max_lat = (float(v) for v in bbox.split(","))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="bbox must be 'min_lng,min_lat,max_lng,max_lat'")
+    if not all(math.isfinite(v) for v in (min_lng, min_lat, max_lng, max_lat)):
+        raise HTTPException(status_code=400, detail="bbox values must be finite numbers")
+    if not (-180 <= min_lng <= 180 and -180 <= max_lng <= 180 and -90 <= min_lat <= 90 and -90 <= max_lat <= 90):
+        raise HTTPException(status_code=400, detail="bbox lat must be within [-90, 90] and lng within [-180, 180]")
+    if min_lng > max_lng or min_lat > max_lat:
+        raise HTTPException(status_code=400, detail="bbox min must not exceed max")
+    return min_lng, min_lat, max_lng, max_lat
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """If-None-Match（カンマ区切り・弱いETag・"*" を含む）が etag に一致するか"""
+    if not if_none_match:
+        return False
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag == "*" or tag.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+@router.get("/map", response_model=DispatchMap)
+def get_dispatch_map(
+    response: Response,
+    delivery_date: date = Query(...),
+    zoom: int = Query(12, ge=MIN_ZOOM, le=MAX_ZOOM),
+    bbox: Optional[str] = Query(None, description="min_lng,min_lat,max_lng,max_lat"),
+    if_none_match: Optional[str] = Header(None),
+    db: Session = Depends(get_db),
+):
+    """配達員ごとのルート（GeoJSON）とズーム別マーカークラスタを返す"""
+    bounds = parse_bbox(bbox) if bbox else None
+
+    # 版数の算出に必要な列だけを取得し、キャッシュがあれば本体の読み込みを省く
+    rows = (
+        db.query(Order.id, Assignment.driver_id, Order.lat, Order.lng, Order.time_start)
+        .outerjoin(Assignment, Assignment.order_id == Order.id)
+        .filter(Order.delivery_date == delivery_date)
+        .all()
+    )
+    drivers = db.query(Driver.id, Driver.name).order_by(Driver.id).all()
+    version = assignment_version([tuple(r) for r in rows] + [(-d.id, d.name) for d in drivers])
+
+    # 内容は版数・ズーム・表示範囲で決まるため、いずれも ETag に含める
+    bbox_tag = "_".join(f"{v:g}" for v in bounds) if bounds else "all"
+    etag = f'"{version}-z{zoom}-{bbox_tag}"'
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+
+    layer = get_cached_layer(delivery_date, version)
+    if layer is None:
+        orders = db.query(Order).filter(Order.delivery_date == delivery_date).all()
+        driver_of = {r.id: r.driver_id for r in rows}
+        grouped: dict[int, list[Order]] = {d.id: [] for d in drivers}
+        unassigned = []
+        for o in orders:
+            driver_id = driver_of.get(o.id)
+            if driver_id in grouped:
+                grouped[driver_id].append(o)
+            else:
+                unassigned.append(o)
+        # total_distance と同じ停車順
+        for driver_id in grouped:
+            grouped[driver_id].sort(key=lambda o: o.time_start)
+
+        layer = build_map_layer(
+            delivery_date, version, grouped, {d.id: d.name for d in drivers}, unassigned,
+        )
+        store_layer(layer)
+
+    response.headers["ETag"] = etag
+    return layer.render(zoom, bounds)
@@ -66,3 +66,19 @@ class DispatchResult(BaseModel):
     date: date
     assignments: list[DispatchResultItem]
     unassigned_orders: list[OrderResponse]
+
+
+# --- Map ---
+
+class MapDriverLayer(BaseModel):
+    driver_id: int
+    driver_name: str
+    route: Optional[dict]   # GeoJSON Feature (LineString)
+    markers: dict           # GeoJSON FeatureCollection (Point)
+
+class DispatchMap(BaseModel):
+    date: date
+    version: str
+    zoom: int
+    drivers: list[MapDriverLayer]
+    unassigned: dict        # GeoJSON FeatureCollection (Point)
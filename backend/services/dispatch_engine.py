@@ -6,8 +6,14 @@ from __future__ import annotations
   1. 配達時間の考慮（希望時間帯のブッキングなし）
   2. 仕事数の平均化
   3. 距離の平均化
+
+モード：
+  greedy   … 時間帯の早い順に1件ずつ最適な配達員を選ぶ（既定）
+  matching … 開始時刻が同じオーダーをまとめて最小コストマッチングで割り当てる
 """
 from datetime import date
+import numpy as np
+from scipy.optimize import linear_sum_assignment
 from models import Order, Driver
 from services.distance_service import calculate_distance_km
 
@@ -48,9 +54,10 @@ def total_distance(orders: list[Order]) -> float:
     return dist
 
 
-def run_dispatch(orders: list[Order], drivers: list[Driver]) -> dict:
+def run_dispatch(orders: list[Order], drivers: list[Driver], mode: str = "greedy") -> dict:
     """
     自動配車を実行し、配達員ごとの割り当てと未割り当てオーダーを返す。
+    mode="matching" の場合は run_dispatch_matching に委ねる。
 
     Returns:
         {
@@ -58,6 +65,8 @@ def run_dispatch(orders: list[Order], drivers: list[Driver]) -> dict:
             "unassigned": [Order, ...]
         }
     """
+    if mode == "matching":
+        return run_dispatch_matching(orders, drivers)
     if not drivers:
         return {"assigned": {}, "unassigned": orders}
 
@@ -96,3 +105,159 @@ def run_dispatch(orders: list[Order], drivers: list[Driver]) -> dict:
         assigned[best_driver.id].append(order)
 
     return {"assigned": assigned, "unassigned": unassigned}
+
+
+# --- 時間帯一括割り当てモード（最小コストマッチング） ---
+
+# 1バッチのコスト行列がこのセル数を超える場合は貪欲法で処理する
+MATCHING_MAX_CELLS = 2_000_000
+
+
+def _haversine_matrix(
+    lat1: np.ndarray, lng1: np.ndarray, lat2: np.ndarray, lng2: np.ndarray
+) -> np.ndarray:
+    """
+    (n,) × (m,) の全組み合わせの距離（km）を返す。
+    calculate_distance_km と同様、どちらかの座標がなければ0。
+    """
+    phi1 = np.radians(lat1)[:, None]
+    phi2 = np.radians(lat2)[None, :]
+    d_phi = phi2 - phi1
+    d_lambda = np.radians(lng2)[None, :] - np.radians(lng1)[:, None]
+    a = np.sin(d_phi / 2) ** 2 + np.cos(phi1) * np.cos(phi2) * np.sin(d_lambda / 2) ** 2
+    dist = 6371.0 * 2 * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+    return np.nan_to_num(dist, nan=0.0)
+
+
+def _coord(value: float | None) -> float:
+    return np.nan if value is None else value
+
+
+class _DriverState:
+    """配達員ごとの件数・総距離・最終地点・時間枠をベクトルで保持する"""
+
+    def __init__(self, drivers: list[Driver]):
+        m = len(drivers)
+        self.drivers = drivers
+        self.assigned: dict[int, list[Order]] = {d.id: [] for d in drivers}
+        self.load = np.zeros(m)
+        self.total = np.zeros(m)
+        self.last_lat = np.full(m, np.nan)
+        self.last_lng = np.full(m, np.nan)
+        # まだ終わっていない（現在の開始時刻より後に終わる）オーダーの時間枠
+        self.active: list[list[tuple[int, int]]] = [[] for _ in range(m)]
+
+    def conflict_matrix(self, start: int, ends: np.ndarray) -> np.ndarray:
+        """
+        開始時刻 start のオーダー群（終了時刻 ends）について (n, m) の衝突行列を返す。
+        開始時刻順に処理するため既存オーダーの開始は start 以下であり、
+        start より後に終わるものだけを見れば has_time_conflict と同じ判定になる。
+        """
+        earliest = np.full(len(self.drivers), np.inf)
+        for j, windows in enumerate(self.active):
+            windows[:] = [w for w in windows if w[1] > start]
+            if windows:
+                earliest[j] = min(w[0] for w in windows)
+        return earliest[None, :] < ends[:, None]
+
+    def leg_matrix(self, lats: np.ndarray, lngs: np.ndarray) -> np.ndarray:
+        """(n, m)：各配達員の最終地点から各オーダーまでの距離"""
+        return _haversine_matrix(lats, lngs, self.last_lat, self.last_lng)
+
+    def assign(self, j: int, order: Order, leg: float, start: int, end: int) -> None:
+        self.assigned[self.drivers[j].id].append(order)
+        self.load[j] += 1
+        self.total[j] += leg
+        self.last_lat[j] = _coord(order.lat)
+        self.last_lng[j] = _coord(order.lng)
+        self.active[j].append((start, end))
+
+
+def _assign_batch_greedy(
+    batch: list[Order], start: int, ends: np.ndarray, state: _DriverState
+) -> list[Order]:
+    """バッチ内を1件ずつ run_dispatch と同じ基準で割り当てる（大規模バッチ用）"""
+    unassigned = []
+    for i, order in enumerate(batch):
+        conflict = state.conflict_matrix(start, ends[i:i + 1])[0]
+        if conflict.all():
+            unassigned.append(order)
+            continue
+        leg = state.leg_matrix(
+            np.array([_coord(order.lat)]), np.array([_coord(order.lng)])
+        )[0]
+        # 第2優先：仕事数、第3優先：総移動距離（同点は配達員リストの先頭）
+        candidates = np.flatnonzero(~conflict)
+        key = np.lexsort((state.total[candidates] + leg[candidates], state.load[candidates]))
+        j = candidates[key[0]]
+        state.assign(j, order, leg[j], start, int(ends[i]))
+    return unassigned
+
+
+def _assign_batch_matching(
+    batch: list[Order], start: int, ends: np.ndarray, state: _DriverState
+) -> list[Order]:
+    """
+    同じ開始時刻のオーダー群を配達員へ一括で割り当てる。
+    コスト = 仕事数 × 重み + 割り当て後の総移動距離、衝突する組は不可。
+    1回のマッチングで各配達員は最大1件なので、残りがあれば繰り返す。
+    """
+    remaining = list(range(len(batch)))
+    lats = np.array([_coord(o.lat) for o in batch])
+    lngs = np.array([_coord(o.lng) for o in batch])
+
+    while remaining:
+        rows = np.array(remaining)
+        conflict = state.conflict_matrix(start, ends[rows])
+        feasible = ~conflict
+        if not feasible.any():
+            break
+
+        leg = state.leg_matrix(lats[rows], lngs[rows])
+        distance = state.total[None, :] + leg
+        # 仕事数の差が距離より必ず優先されるよう重みを距離の最大値より大きくする
+        workload_weight = distance[feasible].max() + 1.0
+        cost = state.load[None, :] * workload_weight + distance
+        # 不可の組は、可能な組をできるだけ多く成立させることを最優先にする大きな値
+        infeasible_cost = (cost[feasible].max() + 1.0) * (min(cost.shape) + 1)
+        cost = np.where(feasible, cost, infeasible_cost)
+
+        row_idx, col_idx = linear_sum_assignment(cost)
+        matched = False
+        for r, j in zip(row_idx, col_idx):
+            if not feasible[r, j]:
+                continue
+            i = rows[r]
+            state.assign(j, batch[i], leg[r, j], start, int(ends[i]))
+            remaining.remove(i)
+            matched = True
+        if not matched:
+            break
+
+    return [batch[i] for i in remaining]
+
+
+def run_dispatch_matching(orders: list[Order], drivers: list[Driver]) -> dict:
+    """
+    開始時刻が同じオーダーをまとめて最小コストマッチングで割り当てる。
+    戻り値の形式は run_dispatch と同じ。
+    """
+    if not drivers:
+        return {"assigned": {}, "unassigned": orders}
+
+    state = _DriverState(drivers)
+    unassigned: list[Order] = []
+
+    batches: dict[int, list[Order]] = {}
+    for order in orders:
+        batches.setdefault(time_to_minutes(order.time_start), []).append(order)
+
+    for start in sorted(batches):
+        batch = batches[start]
+        ends = np.array([time_to_minutes(o.time_end) for o in batch])
+        if len(batch) * len(drivers) > MATCHING_MAX_CELLS:
+            unassigned.extend(_assign_batch_greedy(batch, start, ends, state))
+        else:
+            unassigned.extend(_assign_batch_matching(batch, start, ends, state))
+
+    return {"assigned": state.assigned, "unassigned": unassigned}
@@ -7,6 +7,8 @@ from dotenv import load_dotenv
 load_dotenv()
 
 GOOGLE_MAPS_API_KEY = os.getenv("GOOGLE_MAPS_API_KEY", "")
+# 負荷試験ではローカルのモックサーバーに向ける
+GOOGLE_MAPS_API_BASE_URL = os.getenv("GOOGLE_MAPS_API_BASE_URL", "https://maps.googleapis.com")
 
 
 def haversine_km(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
@@ -23,7 +25,7 @@ async def geocode_address(address: str) -> tuple[float, float] | None:
     """住所をジオコーディングして(lat, lng)を返す。APIキーがなければNone"""
     if not GOOGLE_MAPS_API_KEY:
         return None
-    url = "https://maps.googleapis.com/maps/api/geocode/json"
+    url = f"{GOOGLE_MAPS_API_BASE_URL}/maps/api/geocode/json"
     async with httpx.AsyncClient() as client:
         resp = await client.get(url, params={"address": address, "key": GOOGLE_MAPS_API_KEY})
         data = resp.json()
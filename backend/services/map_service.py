@@ -0,0 +1,300 @@
+from __future__ import annotations
+"""
+地図レイヤー（GeoJSON）を事前計算する
+
+- ルート：total_distance と同じ停車順（time_start 順）のポリラインを
+  ズームレベルに応じて Douglas-Peucker 法で間引く
+- マーカー：Web メルカトルのピクセル座標上でグリッドクラスタリング
+- 結果は (日付, 割り当てバージョン) 単位でキャッシュし、
+  バウンディングボックスによる絞り込みはキャッシュ済みデータに対して行う
+"""
+import hashlib
+import math
+import threading
+from collections import OrderedDict
+from datetime import date
+
+MIN_ZOOM = 0
+MAX_ZOOM = 20
+TILE_SIZE = 256
+CLUSTER_RADIUS_PX = 60        # クラスタリングのグリッド幅（ピクセル）
+SIMPLIFY_TOLERANCE_PX = 1.5   # ルート間引きの許容誤差（ピクセル）
+CACHE_MAX_ENTRIES = 32
+
+BBox = tuple[float, float, float, float]   # (min_lng, min_lat, max_lng, max_lat)
+
+
+# --- 座標変換 ---
+
+def project(lat: float, lng: float, zoom: int) -> tuple[float, float]:
+    """緯度経度 → 指定ズームでの Web メルカトル・ピクセル座標"""
+    scale = TILE_SIZE * (2 ** zoom)
+    siny = min(max(math.sin(math.radians(lat)), -0.9999), 0.9999)
+    x = (lng + 180.0) / 360.0 * scale
+    y = (0.5 - math.log((1 + siny) / (1 - siny)) / (4 * math.pi)) * scale
+    return x, y
+
+
+def degrees_per_pixel(zoom: int) -> float:
+    """赤道上で1ピクセルあたりの経度差"""
+    return 360.0 / (TILE_SIZE * (2 ** zoom))
+
+
+# --- ルートの間引き ---
+
+def _point_segment_distance(
+    p: tuple[float, float], a: tuple[float, float], b: tuple[float, float]
+) -> float:
+    dx, dy = b[0] - a[0], b[1] - a[1]
+    if dx == 0 and dy == 0:
+        return math.hypot(p[0] - a[0], p[1] - a[1])
+    t = ((p[0] - a[0]) * dx + (p[1] - a[1]) * dy) / (dx * dx + dy * dy)
+    t = min(max(t, 0.0), 1.0)
+    return math.hypot(p[0] - (a[0] + t * dx), p[1] - (a[1] + t * dy))
+
+
+def simplify_line(coords: list[tuple[float, float]], tolerance: float) -> list[tuple[float, float]]:
+    """
+    Douglas-Peucker 法でポリラインを間引く（始点・終点は必ず残す）。
+    再帰ではなくスタックで処理するため長いルートでも深さ制限に掛からない。
+    """
+    if len(coords) <= 2 or tolerance <= 0:
+        return list(coords)
+
+    keep = [False] * len(coords)
+    keep[0] = keep[-1] = True
+    stack = [(0, len(coords) - 1)]
+    while stack:
+        first, last = stack.pop()
+        max_dist = 0.0
+        index = first
+        for i in range(first + 1, last):
+            dist = _point_segment_distance(coords[i], coords[first], coords[last])
+            if dist > max_dist:
+                max_dist = dist
+                index = i
+        if max_dist > tolerance:
+            keep[index] = True
+            stack.append((first, index))
+            stack.append((index, last))
+    return [c for c, k in zip(coords, keep) if k]
+
+
+# --- クラスタリング ---
+
+def cluster_points(points: list[dict], zoom: int) -> list[dict]:
+    """
+    points: [{"order_id", "lat", "lng", "seq"}, ...]
+    同じグリッドセルに入った点を1つのクラスタにまとめる。
+    1件だけのセルは個別マーカーとして返す。
+    """
+    cells: dict[tuple[int, int], list[dict]] = {}
+    for p in points:
+        x, y = project(p["lat"], p["lng"], zoom)
+        key = (int(x // CLUSTER_RADIUS_PX), int(y // CLUSTER_RADIUS_PX))
+        cells.setdefault(key, []).append(p)
+
+    clusters = []
+    for members in cells.values():
+        lat = sum(m["lat"] for m in members) / len(members)
+        lng = sum(m["lng"] for m in members) / len(members)
+        clusters.append({
+            "lat": lat,
+            "lng": lng,
+            "count": len(members),
+            "order_ids": [m["order_id"] for m in members],
+            "seq": members[0]["seq"] if len(members) == 1 else None,
+        })
+    clusters.sort(key=lambda c: c["order_ids"][0])
+    return clusters
+
+
+# --- GeoJSON 組み立て ---
+
+def _in_bbox(lat: float, lng: float, bbox: BBox | None) -> bool:
+    if bbox is None:
+        return True
+    min_lng, min_lat, max_lng, max_lat = bbox
+    return min_lat <= lat <= max_lat and min_lng <= lng <= max_lng
+
+
+def _bbox_intersects(a: BBox, b: BBox | None) -> bool:
+    if b is None:
+        return True
+    return not (a[2] < b[0] or b[2] < a[0] or a[3] < b[1] or b[3] < a[1])
+
+
+def _cluster_feature(cluster: dict, driver_id: int | None) -> dict:
+    properties = {
+        "driver_id": driver_id,
+        "count": cluster["count"],
+        "order_ids": cluster["order_ids"],
+    }
+    if cluster["seq"] is not None:
+        properties["seq"] = cluster["seq"]
+    return {
+        "type": "Feature",
+        "geometry": {"type": "Point", "coordinates": [cluster["lng"], cluster["lat"]]},
+        "properties": properties,
+    }
+
+
+def _route_feature(coords: list[tuple[float, float]], driver_id: int, stops: int) -> dict:
+    # coords は (lat, lng)。GeoJSON は [lng, lat] の順。間引き後なので点数は stops と一致しない
+    return {
+        "type": "Feature",
+        "geometry": {"type": "LineString", "coordinates": [[lng, lat] for lat, lng in coords]},
+        "properties": {"driver_id": driver_id, "stops": stops},
+    }
+
+
+class MapLayer:
+    """
+    1日分の配車結果から作った地図レイヤー。
+    ズームごとのクラスタ・間引きルートは初回要求時に計算して保持する。
+    """
+
+    def __init__(self, delivery_date: date, version: str, drivers: list[dict], unassigned: list[dict]):
+        self.delivery_date = delivery_date
+        self.version = version
+        self.drivers = drivers
+        self.unassigned = unassigned
+        self._by_zoom: dict[int, dict] = {}
+        self._lock = threading.Lock()
+
+    def _build_zoom(self, zoom: int) -> dict:
+        tolerance = SIMPLIFY_TOLERANCE_PX * degrees_per_pixel(zoom)
+        drivers = []
+        for d in self.drivers:
+            route = simplify_line(d["route"], tolerance) if len(d["route"]) >= 2 else []
+            drivers.append({
+                "route": route,
+                "route_bbox": _coords_bbox(route),
+                "clusters": cluster_points(d["stops"], zoom),
+            })
+        return {
+            "drivers": drivers,
+            "unassigned": cluster_points(self.unassigned, zoom),
+        }
+
+    def _zoom_data(self, zoom: int) -> dict:
+        with self._lock:
+            data = self._by_zoom.get(zoom)
+            if data is None:
+                data = self._build_zoom(zoom)
+                self._by_zoom[zoom] = data
+            return data
+
+    def render(self, zoom: int, bbox: BBox | None = None) -> dict:
+        """指定ズーム・表示範囲の GeoJSON を返す"""
+        zoom = min(max(zoom, MIN_ZOOM), MAX_ZOOM)
+        data = self._zoom_data(zoom)
+
+        driver_layers = []
+        for d, z in zip(self.drivers, data["drivers"]):
+            route = None
+            if z["route"] and _bbox_intersects(z["route_bbox"], bbox):
+                route = _route_feature(z["route"], d["driver_id"], len(d["stops"]))
+            driver_layers.append({
+                "driver_id": d["driver_id"],
+                "driver_name": d["driver_name"],
+                "route": route,
+                "markers": {
+                    "type": "FeatureCollection",
+                    "features": [
+                        _cluster_feature(c, d["driver_id"])
+                        for c in z["clusters"] if _in_bbox(c["lat"], c["lng"], bbox)
+                    ],
+                },
+            })
+
+        return {
+            "date": self.delivery_date,
+            "version": self.version,
+            "zoom": zoom,
+            "drivers": driver_layers,
+            "unassigned": {
+                "type": "FeatureCollection",
+                "features": [
+                    _cluster_feature(c, None)
+                    for c in data["unassigned"] if _in_bbox(c["lat"], c["lng"], bbox)
+                ],
+            },
+        }
+
+
+def _coords_bbox(coords: list[tuple[float, float]]) -> BBox:
+    if not coords:
+        return (0.0, 0.0, 0.0, 0.0)
+    lats = [c[0] for c in coords]
+    lngs = [c[1] for c in coords]
+    return (min(lngs), min(lats), max(lngs), max(lats))
+
+
+def _has_coords(order) -> bool:
+    return order.lat is not None and order.lng is not None
+
+
+def build_map_layer(
+    delivery_date: date,
+    version: str,
+    grouped: dict[int, list],
+    driver_names: dict[int, str],
+    unassigned: list,
+) -> MapLayer:
+    """
+    grouped: {driver_id: [Order, ...]}（停車順に並べ替え済み）
+    座標のないオーダーは地図に載せられないため除外する。
+    """
+    drivers = []
+    for driver_id, orders in grouped.items():
+        stops = [
+            {"order_id": o.id, "lat": o.lat, "lng": o.lng, "seq": i + 1}
+            for i, o in enumerate(orders) if _has_coords(o)
+        ]
+        drivers.append({
+            "driver_id": driver_id,
+            "driver_name": driver_names.get(driver_id, ""),
+            "route": [(s["lat"], s["lng"]) for s in stops],
+            "stops": stops,
+        })
+    unassigned_points = [
+        {"order_id": o.id, "lat": o.lat, "lng": o.lng, "seq": None}
+        for o in unassigned if _has_coords(o)
+    ]
+    return MapLayer(delivery_date, version, drivers, unassigned_points)
+
+
+def assignment_version(rows: list[tuple]) -> str:
+    """
+    割り当て・座標・時間帯の組から版数（ハッシュ）を作る。
+    いずれかが変われば版数も変わり、古いキャッシュは使われなくなる。
+    """
+    digest = hashlib.sha1()
+    for row in sorted(rows, key=lambda r: r[0]):
+        digest.update(repr(row).encode())
+    return digest.hexdigest()[:16]
+
+
+# --- キャッシュ ---
+
+_cache: OrderedDict[tuple[date, str], MapLayer] = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def get_cached_layer(delivery_date: date, version: str) -> MapLayer | None:
+    with _cache_lock:
+        layer = _cache.get((delivery_date, version))
+        if layer is not None:
+            _cache.move_to_end((delivery_date, version))
+        return layer
+
+
+def store_layer(layer: MapLayer) -> None:
+    with _cache_lock:
+        # 同じ日付の古い版は不要なので捨てる
+        for key in [k for k in _cache if k[0] == layer.delivery_date]:
+            del _cache[key]
+        _cache[(layer.delivery_date, layer.version)] = layer
+        while len(_cache) > CACHE_MAX_ENTRIES:
+            _cache.popitem(last=False)
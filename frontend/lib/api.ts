@@ -1,4 +1,4 @@
-import { Driver, Order, DispatchResult } from "./types";
+import { Driver, Order, DispatchResult, DispatchMap } from "./types";
 
 const BASE_URL = process.env.NEXT_PUBLIC_API_URL || "http://localhost:8001";
 
@@ -44,8 +44,8 @@ export const importOrdersCSV = async (date: string, file: File): Promise<Order[]
 };
 
 // --- Dispatch ---
-export const runDispatch = (date: string) =>
-  request<DispatchResult>(`/dispatch/run?delivery_date=${date}`, { method: "POST" });
+export const runDispatch = (date: string, mode: "greedy" | "matching" = "greedy") =>
+  request<DispatchResult>(`/dispatch/run?delivery_date=${date}&mode=${mode}`, { method: "POST" });
 export const getDispatchResult = (date: string) =>
   request<DispatchResult>(`/dispatch/result?delivery_date=${date}`);
 export const manualAssign = (date: string, assignments: { order_id: number; driver_id: number }[]) =>
@@ -53,4 +53,12 @@ export const manualAssign = (date: string, assignments: { order_id: number; driv
     method: "PUT",
     body: JSON.stringify({ assignments }),
   });
+export const getDispatchMap = (
+  date: string,
+  zoom: number,
+  bbox?: [number, number, number, number] // [min_lng, min_lat, max_lng, max_lat]
+) =>
+  request<DispatchMap>(
+    `/dispatch/map?delivery_date=${date}&zoom=${zoom}` + (bbox ? `&bbox=${bbox.join(",")}` : "")
+  );
 export const getPdfUrl = (date: string) => `${BASE_URL}/dispatch/pdf?delivery_date=${date}`;
@@ -30,3 +30,37 @@ export interface DispatchResult {
   assignments: DispatchResultItem[];
   unassigned_orders: Order[];
 }
+
+// --- Map (GeoJSON) ---
+
+export interface MapRouteFeature {
+  type: "Feature";
+  geometry: { type: "LineString"; coordinates: [number, number][] };
+  properties: { driver_id: number; stops: number };
+}
+
+export interface MapMarkerFeature {
+  type: "Feature";
+  geometry: { type: "Point"; coordinates: [number, number] };
+  properties: { driver_id: number | null; count: number; order_ids: number[]; seq?: number };
+}
+
+export interface MapMarkerCollection {
+  type: "FeatureCollection";
+  features: MapMarkerFeature[];
+}
+
+export interface MapDriverLayer {
+  driver_id: number;
+  driver_name: string;
+  route: MapRouteFeature | null;
+  markers: MapMarkerCollection;
+}
+
+export interface DispatchMap {
+  date: string;
+  version: string;
+  zoom: number;
+  drivers: MapDriverLayer[];
+  unassigned: MapMarkerCollection;
+}